@@ -4,18 +4,78 @@ Binance 加密货币数据下载工具 - 改进版
 增强网络容错和重试机制
 """
 
-import ccxt
+import argparse
+import asyncio
+import json
+import logging
+import random
+import ssl
+import aiohttp
+import certifi
+import ccxt.async_support as ccxt
+import numpy as np
 import pandas as pd
-from datetime import datetime
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
 import time
 import os
 
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+
+logger = logging.getLogger(__name__)
+
+# 进度日志的最小间隔（秒）
+PROGRESS_INTERVAL = 0.5
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# 缓存文件的列类型：毫秒时间戳 + 5 个 float64
+OHLCV_SCHEMA = pa.schema(
+    [('timestamp', pa.int64())] + [(name, pa.float64()) for name in OHLCV_COLUMNS[1:]]
+)
+
+# 只对网络类错误重试，程序错误（KeyError 等）直接抛出
+RETRYABLE_ERRORS = (
+    ccxt.NetworkError,
+    ccxt.RequestTimeout,
+    ccxt.DDoSProtection,
+    ccxt.ExchangeNotAvailable,
+)
+
+# Binance 单次 K 线请求上限，以及每个 paginate 窗口包含的请求数
+OHLCV_PAGE_LIMIT = 1000
+PAGINATION_CALLS = 20
+
+
+@lru_cache(maxsize=64)
+def _parse_iso_ms(iso_str):
+    """'YYYY-MM-DDTHH:MM:SSZ' 转毫秒时间戳（批量下载时各币种日期相同，结果可复用）"""
+    dt = datetime.strptime(iso_str, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+@lru_cache(maxsize=32)
+def _timeframe_ms(timeframe):
+    """K 线周期转毫秒，如 '4h' -> 14400000"""
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
 
 class BinanceCryptoDownloaderV2:
     """改进版 Binance 下载器 - 增强网络容错"""
     
-    def __init__(self):
-        """初始化下载器"""
+    def __init__(self, tty_progress=False):
+        """初始化下载器
+        
+        tty_progress: 交互终端下用 tqdm 进度条代替进度日志
+        """
         # 💡 提示：请确保你的 VPN 开启了本地端口（通常是 7890 或 1080）
         proxy_url = 'http://127.0.0.1:7890' 
         
@@ -34,41 +94,102 @@ class BinanceCryptoDownloaderV2:
                     'enableRateLimit': True,
                     'timeout': 30000,
                     'options': {'defaultType': 'spot'},
-                    # ✅ 修复：必须是字典格式
-                    'proxies': {
-                        'http': proxy_url,
-                        'https': proxy_url,
-                    },
+                    # ✅ 异步版 ccxt 走 aiohttp，代理需用 aiohttp_proxy
+                    'aiohttp_proxy': proxy_url,
                 }
             }
         ]
         
+        if tty_progress and tqdm is None:
+            print("⚠️ 未安装 tqdm，改用日志显示进度（pip install tqdm）")
+        self.tty_progress = tty_progress and tqdm is not None
+        
         self.exchange = None
-        self._init_exchange()
+        # 所有连接尝试和币种共用一个 aiohttp 会话，复用 TCP/TLS 连接
+        self.session = None
         
         self.data_dir = 'trading_data/raw'
         os.makedirs(self.data_dir, exist_ok=True)
+        
+        self.cache_dir = 'trading_data/cache'
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    async def connect(self):
+        """建立交易所连接（需在事件循环中调用）"""
+        await self._init_exchange()
+    
+    async def close(self):
+        """关闭交易所连接，释放 aiohttp 会话"""
+        await self._close_exchange()
+        
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+    
+    async def _close_exchange(self):
+        """关闭交易所实例（共享会话由 close 负责）"""
+        if self.exchange is not None:
+            await self.exchange.close()
+            self.exchange = None
     
-    def _init_exchange(self):
+    def _create_session(self):
+        """创建带连接池的共享 aiohttp 会话"""
+        connector = aiohttp.TCPConnector(
+            limit=32,
+            keepalive_timeout=60,
+            ssl=ssl.create_default_context(cafile=certifi.where()),
+            enable_cleanup_closed=True,
+        )
+        return aiohttp.ClientSession(connector=connector)
+    
+    async def _init_exchange(self):
         """初始化交易所连接"""
+        if self.session is None:
+            self.session = self._create_session()
+        
         for option in self.exchange_options:
             try:
                 print(f"尝试连接 {option['name']}...")
-                self.exchange = ccxt.binance(option['config'])
+                self.exchange = ccxt.binance({**option['config'], 'session': self.session})
                 
-                # 测试连接
-                self.exchange.fetch_ticker('BTC/USDT')
+                # 测试连接（服务器时间接口响应最小）
+                await self.exchange.fetch_time()
+                await self._load_markets_cached()
                 print(f"✅ {option['name']} 连接成功\n")
                 return
             except Exception as e:
                 print(f"❌ {option['name']} 连接失败: {str(e)[:50]}...")
+                await self._close_exchange()
                 continue
         
         print("\n⚠️ 所有连接方式都失败了")
         print("请检查网络连接或稍后重试")
-        exit(1)
+        
+        # 先释放共享会话再报错，由调用方决定退出还是记为失败
+        await self.close()
+        raise ConnectionError("所有连接方式都失败了")
     
-    def download_crypto(self, symbol, start_date, end_date=None, timeframe='4h', max_retries=3):
+    async def _load_markets_cached(self, ttl=24 * 3600):
+        """加载交易对信息，24 小时内复用本地缓存"""
+        path = os.path.join(self.cache_dir, 'markets.json')
+        
+        if os.path.exists(path) and time.time() - os.path.getmtime(path) < ttl:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self.exchange.set_markets(json.load(f))
+                return
+            except Exception as e:
+                print(f"  ⚠️ 交易对缓存读取失败，重新加载: {str(e)[:50]}")
+        
+        await self.exchange.load_markets()
+        
+        # 先写临时文件再替换，避免留下半截缓存（多进程下各用各的临时文件）
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.exchange.markets, f)
+        os.replace(tmp_path, path)
+    
+    async def download_crypto(self, symbol, start_date, end_date=None, timeframe='4h', max_retries=3):
         """
         下载加密货币数据（增强容错）
         """
@@ -78,137 +199,451 @@ class BinanceCryptoDownloaderV2:
         
         for attempt in range(max_retries):
             try:
-                return self._download_with_retry(symbol, start_date, end_date, timeframe)
-            except Exception as e:
+                return await self._download_with_retry(symbol, start_date, end_date, timeframe)
+            except RETRYABLE_ERRORS as e:
                 print(f"❌ 尝试 {attempt + 1}/{max_retries} 失败: {str(e)[:80]}")
                 
                 if attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 5
-                    print(f"⏳ 等待 {wait_time} 秒后重试...")
-                    time.sleep(wait_time)
+                    wait_time = self._retry_delay(attempt, e)
+                    print(f"⏳ 等待 {wait_time:.1f} 秒后重试...")
+                    await asyncio.sleep(wait_time)
                 else:
                     print(f"❌ {symbol} 下载失败，已达最大重试次数")
                     return None
     
-    def _download_with_retry(self, symbol, start_date, end_date, timeframe):
-        """实际下载逻辑"""
-        since = self.exchange.parse8601(f'{start_date}T00:00:00Z')
+    def _retry_delay(self, attempt, error):
+        """指数退避 + 随机抖动，限流时至少等待 30 秒并遵守 Retry-After"""
+        wait_time = min(60, 2 ** attempt) + random.uniform(0, 1)
+        
+        if isinstance(error, ccxt.DDoSProtection):
+            wait_time = max(wait_time, 30)
+        
+        headers = getattr(self.exchange, 'last_response_headers', None) or {}
+        retry_after = headers.get('Retry-After')
+        
+        if retry_after and str(retry_after).isdigit():
+            wait_time = max(wait_time, int(retry_after))
+        
+        return wait_time
+    
+    async def _download_with_retry(self, symbol, start_date, end_date, timeframe):
+        """实际下载逻辑（优先使用本地缓存，只拉取增量）"""
+        start_ts = _parse_iso_ms(f'{start_date}T00:00:00Z')
         
         if end_date:
-            end_ts = self.exchange.parse8601(f'{end_date}T23:59:59Z')
+            end_ts = _parse_iso_ms(f'{end_date}T23:59:59Z')
         else:
             end_ts = None
         
-        all_ohlcv = []
+        # 周期长度只解析一次，供缓存判断和分页使用
+        tf_ms = _timeframe_ms(timeframe)
+        
+        cache_path = self._cache_path(symbol, timeframe)
+        cache_meta = self._load_cache(cache_path)
+        
+        # 缓存始终是一段连续区间 [covered_from, 最后一根 K 线]，只在两端补数据
+        head = tail = None
+        
+        if cache_meta is None:
+            tail = (start_ts, end_ts)
+            covered_from = start_ts
+            fetched_at = self.exchange.milliseconds()
+        else:
+            covered_from = cache_meta['covered_from']
+            fetched_at = cache_meta['fetched_at']
+            last_ts = cache_meta['last_ts']
+            
+            # 起始时间早于缓存：一直补到缓存开头，即使超出请求的结束时间，避免缓存出现断档
+            if start_ts < covered_from:
+                print(f"  ♻️ 使用缓存，补齐 {pd.to_datetime(start_ts, unit='ms')} 之后的历史数据")
+                head = (start_ts, covered_from - 1)
+                covered_from = start_ts
+            
+            # 从最后一根 K 线重新拉取，以刷新缓存时尚未收盘的数据；
+            # 尾部区间必须包含最后一根 K 线，否则改写缓存会把它丢掉
+            if (not self._cache_is_fresh(last_ts, fetched_at, end_ts, tf_ms)
+                    and (end_ts is None or last_ts <= end_ts)):
+                print(f"  ♻️ 使用缓存，从 {pd.to_datetime(last_ts, unit='ms')} 开始增量下载")
+                tail = (last_ts, end_ts)
+                fetched_at = self.exchange.milliseconds()
+            
+            if head is None and tail is None:
+                print(f"  ♻️ 缓存已是最新，跳过下载")
+        
+        if head is not None or tail is not None:
+            await self._rebuild_cache(
+                symbol, timeframe, tf_ms, cache_path, cache_meta, head, tail, covered_from, fetched_at
+            )
+        
+        if not os.path.exists(cache_path):
+            return None
+        
+        # 只读取请求的时间范围，按行组统计信息跳过无关数据
+        filters = [('timestamp', '>=', start_ts)]
+        if end_ts:
+            filters.append(('timestamp', '<=', end_ts))
+        
+        table = pq.read_table(cache_path, filters=filters)
+        
+        if table.num_rows == 0:
+            return None
+        
+        ts = table['timestamp'].to_numpy()
+        assert (ts[1:] >= ts[:-1]).all(), "缓存时间戳未按升序排列"
+        
+        # 直接由列数组构建 DataFrame，省去整表拷贝和排序
+        df = pd.DataFrame({
+            'time': pd.to_datetime(ts, unit='ms'),
+            'open': table['open'].to_numpy(),
+            'high': table['high'].to_numpy(),
+            'low': table['low'].to_numpy(),
+            'close': table['close'].to_numpy(),
+            'volume': table['volume'].to_numpy(),
+        })
+        
+        print(f"✅ 下载完成!")
+        print(f"   总K线数: {len(df)}")
+        print(f"   时间范围: {df['time'].min()} 至 {df['time'].max()}")
+        
+        return df
+    
+    async def _fetch_ohlcv_range(self, symbol, timeframe, tf_ms, since, end_ts, writer):
+        """拉取 [since, end_ts] 范围内的 K 线并逐窗口写入 ParquetWriter，返回总行数"""
+        # 生产者拉取下一窗口的同时，消费者写入当前窗口
+        queue = asyncio.Queue(maxsize=2)
+        producer = asyncio.create_task(
+            self._produce_ohlcv_pages(symbol, timeframe, tf_ms, since, end_ts, queue)
+        )
+        
+        # 只为一个窗口预分配 float64 缓冲区，写完即复用
+        buf = np.empty((PAGINATION_CALLS * OHLCV_PAGE_LIMIT, len(OHLCV_COLUMNS)), dtype=np.float64)
+        total = 0
         batch_count = 0
-        consecutive_errors = 0
         
-        while True:
-            try:
-                # 获取数据
-                ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, since, limit=1000)
+        # 并发下载时逐行 print 会互相覆盖，进度改为限频日志或 tqdm
+        symbol_logger = logger.getChild(symbol.replace('/', ''))
+        last_report = time.monotonic()
+        progress = None
+        
+        if self.tty_progress:
+            estimated_bars = ((end_ts or self.exchange.milliseconds()) - since) // tf_ms + 1
+            progress = tqdm(total=estimated_bars, desc=symbol, unit='bar', leave=False)
+        
+        try:
+            while True:
+                ohlcv = await queue.get()
                 
-                if not ohlcv:
+                if ohlcv is None:
                     break
                 
-                all_ohlcv.extend(ohlcv)
-                batch_count += 1
-                consecutive_errors = 0  # 重置错误计数
+                n = len(ohlcv)
                 
-                # 更新时间
-                since = ohlcv[-1][0] + 1
+                if n > len(buf):
+                    buf = np.empty((n, buf.shape[1]), dtype=np.float64)
                 
-                if end_ts and since >= end_ts:
-                    break
+                buf[:n] = ohlcv
+                table = pa.table({
+                    'timestamp': buf[:n, 0].astype('int64'),
+                    'open': buf[:n, 1],
+                    'high': buf[:n, 2],
+                    'low': buf[:n, 3],
+                    'close': buf[:n, 4],
+                    'volume': buf[:n, 5],
+                }, schema=OHLCV_SCHEMA)
+                writer.write_table(table)
                 
-                if len(ohlcv) < 1000:
-                    break
+                total += n
+                batch_count += 1
                 
                 # 显示进度
-                print(f"  已下载 {len(all_ohlcv)} 根K线（批次 {batch_count}）", end='\r')
-                
-                # 短暂延迟
-                time.sleep(0.2)
-                
-            except Exception as e:
-                consecutive_errors += 1
-                
-                if consecutive_errors > 3:
-                    raise Exception(f"连续错误过多: {e}")
-                
-                print(f"\n  ⚠️ 临时错误，继续重试... ({consecutive_errors}/3)")
-                time.sleep(2)
-                continue
+                if progress is not None:
+                    progress.update(n)
+                else:
+                    now = time.monotonic()
+                    if now - last_report > PROGRESS_INTERVAL:
+                        symbol_logger.info("%s: 已下载 %d 根K线（批次 %d）", symbol, total, batch_count)
+                        last_report = now
+            
+            # 抛出生产者中的异常（如 ccxt 重试耗尽后的网络错误）
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+            if progress is not None:
+                progress.close()
         
-        print()  # 换行
+        symbol_logger.info("%s: 共下载 %d 根K线（批次 %d）", symbol, total, batch_count)
         
-        if not all_ohlcv:
+        return total
+    
+    def _cache_path(self, symbol, timeframe):
+        """缓存文件路径"""
+        coin_name = symbol.replace('/', '')
+        return os.path.join(self.cache_dir, f"{coin_name}_{timeframe}.parquet")
+    
+    def _load_cache(self, cache_path):
+        """读取缓存的覆盖范围和抓取时间（只读元数据），不存在或损坏时返回 None"""
+        if not os.path.exists(cache_path):
             return None
         
-        # 转换为 DataFrame
-        df = pd.DataFrame(
-            all_ohlcv,
-            columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']
-        )
-        df['time'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df = df[['time', 'open', 'high', 'low', 'close', 'volume']]
-        df = df.sort_values('time').reset_index(drop=True)
+        try:
+            parquet_file = pq.ParquetFile(cache_path)
+            ts = self._cache_time_bounds(parquet_file)
+        except Exception as e:
+            print(f"  ⚠️ 缓存读取失败，将重新下载: {str(e)[:50]}")
+            return None
         
-        print(f"✅ 下载完成!")
-        print(f"   总K线数: {len(df)}")
-        print(f"   时间范围: {df['time'].min()} 至 {df['time'].max()}")
+        if ts is None:
+            return None
         
-        return df
+        first_ts, last_ts = ts
+        
+        # 旧版缓存没有元数据：覆盖范围从第一根 K 线算起，抓取时间未知
+        stored = parquet_file.schema_arrow.metadata or {}
+        
+        return {
+            'last_ts': last_ts,
+            'covered_from': int(stored.get(b'covered_from', first_ts)),
+            'fetched_at': int(stored.get(b'fetched_at', 0)),
+        }
+    
+    def _cache_time_bounds(self, parquet_file):
+        """由行组统计信息得到首尾时间戳，缺少统计信息时只读 timestamp 列"""
+        metadata = parquet_file.metadata
+        
+        if metadata.num_rows == 0:
+            return None
+        
+        column = parquet_file.schema_arrow.get_field_index('timestamp')
+        first = metadata.row_group(0).column(column).statistics
+        last = metadata.row_group(metadata.num_row_groups - 1).column(column).statistics
+        
+        if first is not None and last is not None and first.has_min_max and last.has_min_max:
+            return int(first.min), int(last.max)
+        
+        ts = parquet_file.read(columns=['timestamp'])['timestamp'].to_numpy()
+        return int(ts[0]), int(ts[-1])
+    
+    def _cache_is_fresh(self, last_ts, fetched_at, end_ts, tf_ms):
+        """缓存是否无需再拉取尾部数据
+        
+        结束时间早于最后一根 K 线时无需拉取；否则最后一根 K 线需包含结束时间
+        （未指定时为当前时间），且这根 K 线在缓存时已收盘，或缓存距今不足
+        一个周期（TTL = 周期长度）。
+        """
+        # 结束时间早于最后一根 K 线：请求的区间已全部在缓存里
+        if end_ts and end_ts < last_ts:
+            return True
+        
+        now = self.exchange.milliseconds()
+        target = min(end_ts, now) if end_ts else now
+        
+        if last_ts + tf_ms <= target:
+            return False
+        
+        return fetched_at >= last_ts + tf_ms or now - fetched_at < tf_ms
+    
+    async def _rebuild_cache(self, symbol, timeframe, tf_ms, cache_path, cache_meta, head, tail,
+                             covered_from, fetched_at):
+        """按时间顺序把 头部新数据 → 原有缓存 → 尾部新数据 流式写入新缓存文件
+        
+        下载和改写期间内存只占一个窗口，原有缓存按批次复制（顺带合并零碎的行组），
+        全部成功后才替换旧文件。
+        """
+        schema = OHLCV_SCHEMA.with_metadata({
+            b'covered_from': str(covered_from).encode(),
+            b'fetched_at': str(fetched_at).encode(),
+        })
+        batch_size = PAGINATION_CALLS * OHLCV_PAGE_LIMIT
+        tmp_path = f"{cache_path}.tmp"
+        rows = 0
+        
+        try:
+            with pq.ParquetWriter(tmp_path, schema, compression='snappy') as writer:
+                if head is not None:
+                    rows += await self._fetch_ohlcv_range(symbol, timeframe, tf_ms, *head, writer)
+                
+                if cache_meta is not None:
+                    for batch in pq.ParquetFile(cache_path).iter_batches(batch_size=batch_size, columns=OHLCV_COLUMNS):
+                        table = pa.Table.from_batches([batch]).cast(OHLCV_SCHEMA)
+                        
+                        # 尾部会从最后一根 K 线重新拉取，丢弃旧的那一根
+                        if tail is not None:
+                            table = table.filter(pc.less(table['timestamp'], tail[0]))
+                        
+                        writer.write_table(table)
+                        rows += table.num_rows
+                
+                if tail is not None:
+                    rows += await self._fetch_ohlcv_range(symbol, timeframe, tf_ms, *tail, writer)
+            
+            # 首次下载且没有任何数据时不生成空缓存
+            if rows or cache_meta is not None:
+                os.replace(tmp_path, cache_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    async def _produce_ohlcv_pages(self, symbol, timeframe, tf_ms, since, end_ts, queue):
+        """按窗口拉取 K 线并放入队列，结束时放入 None
+        
+        每个窗口交给 ccxt 的 paginate 模式完成分页、去重和限速，
+        窗口内的请求由 ccxt 并发发出。
+        """
+        page_ms = tf_ms * OHLCV_PAGE_LIMIT
+        end = end_ts or self.exchange.milliseconds()
+        
+        try:
+            while since <= end:
+                window_end = min(since + PAGINATION_CALLS * page_ms - 1, end)
+                
+                # ccxt 会把起点限制在 now - paginationCalls * 单页跨度 之后，
+                # 所以调用上限要覆盖到当前时间；实际请求数仍受 until 限制
+                now = self.exchange.milliseconds()
+                max_calls = max(PAGINATION_CALLS, -(-(now - since) // page_ms) + 1)
+                
+                ohlcv = await self._fetch_window(symbol, timeframe, since, window_end, max_calls)
+                
+                # 空窗口（如币种上市前）直接跳过
+                if not ohlcv:
+                    since = window_end + 1
+                    continue
+                
+                # ccxt 只返回时间戳 >= since 的 K 线，since 每轮严格递增，循环必然结束
+                since = ohlcv[-1][0] + 1
+                
+                await queue.put(ohlcv)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # 先让消费者退出，异常随后在 await producer 处抛出
+            await queue.put(None)
+            raise
+        
+        await queue.put(None)
+    
+    async def _fetch_window(self, symbol, timeframe, since, window_end, max_calls, max_retries=3):
+        """拉取一个窗口，ccxt 单页重试耗尽后再按退避策略重试整个窗口"""
+        for attempt in range(max_retries + 1):
+            try:
+                return await self.exchange.fetch_ohlcv(
+                    symbol, timeframe, since, None,
+                    params={'paginate': True, 'paginationCalls': max_calls, 'until': window_end},
+                )
+            except RETRYABLE_ERRORS as e:
+                if attempt >= max_retries:
+                    raise
+                
+                wait_time = self._retry_delay(attempt, e)
+                logger.warning(
+                    "%s: 临时错误，%.1f 秒后重试... (%d/%d)", symbol, wait_time, attempt + 1, max_retries
+                )
+                await asyncio.sleep(wait_time)
     
     def save_data(self, df, filename):
         """保存数据"""
         if df is None or len(df) == 0:
             return False
         
-        filepath = f"{self.data_dir}/{filename}"
-        df.to_csv(filepath, index=False)
+        filepath = os.path.join(self.data_dir, filename)
+        
+        # 同一个 1MB 缓冲句柄写入并取大小，省去写完后的 stat
+        with open(filepath, 'wb', buffering=1 << 20) as f:
+            # 默认 Parquet（列式 + snappy），其他扩展名沿用 CSV
+            if filename.endswith('.parquet'):
+                # 直接交给 pyarrow 写入句柄；df.to_parquet 会按句柄的文件名重新打开文件
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                pq.write_table(table, f, compression='snappy')
+            else:
+                self._fast_write_ohlcv_csv(df, f)
+            
+            size_bytes = f.tell()
         
-        file_size = os.path.getsize(filepath) / 1024
         print(f"✅ 数据已保存: {filepath}")
-        print(f"   文件大小: {file_size:.2f} KB")
+        print(f"   文件大小: {size_bytes / 1024:.2f} KB")
         
         return True
     
-    def download_and_save(self, symbol, start_date, end_date=None, timeframe='4h'):
+    def _fast_write_ohlcv_csv(self, df, f):
+        """纯数值 OHLCV 的 CSV 快速写入（二进制句柄），绕过 pandas 逐单元格格式化"""
+        times = np.datetime_as_string(df['time'].values, unit='s')
+        times = np.char.replace(times, 'T', ' ').astype('S19')
+        columns = [df[k].to_numpy(dtype=np.float64) for k in ['open', 'high', 'low', 'close', 'volume']]
+        
+        f.write(b"time,open,high,low,close,volume\n")
+        for row in zip(times.tolist(), *(c.tolist() for c in columns)):
+            f.write(b"%s,%.8f,%.8f,%.8f,%.8f,%.8f\n" % row)
+    
+    async def download_and_save(self, symbol, start_date, end_date=None, timeframe='4h'):
         """一键下载并保存"""
-        df = self.download_crypto(symbol, start_date, end_date, timeframe)
+        df = await self.download_crypto(symbol, start_date, end_date, timeframe)
         
         if df is None:
             return False
         
         coin_name = symbol.replace('/', '')
         date_str = datetime.now().strftime('%Y%m%d')
-        filename = f"{coin_name}_{timeframe.upper()}_Binance_{date_str}.csv"
+        filename = f"{coin_name}_{timeframe.upper()}_Binance_{date_str}.parquet"
         
         return self.save_data(df, filename)
     
-    def batch_download(self, symbols, start_date, end_date=None, timeframe='4h'):
-        """批量下载"""
+    async def batch_download(self, symbols, start_date, end_date=None, timeframe='4h', max_concurrency=5):
+        """批量下载（并发）"""
         print(f"\n{'='*60}")
-        print(f"批量下载 {len(symbols)} 个加密货币")
+        print(f"批量下载 {len(symbols)} 个加密货币（并发 {max_concurrency}）")
         print(f"{'='*60}")
         
+        # 限制同时进行的下载数，单个请求的节奏由 enableRateLimit 控制
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run_one(i, symbol):
+            async with semaphore:
+                print(f"\n[{i}/{len(symbols)}] 正在处理 {symbol}")
+                print("-" * 60)
+                return await self.download_and_save(symbol, start_date, end_date, timeframe)
+        
+        tasks = [run_one(i, symbol) for i, symbol in enumerate(symbols, 1)]
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        return self._summarize(symbols, outcomes)
+    
+    def batch_download_in_processes(self, symbols, start_date, end_date=None, timeframe='4h', max_workers=5):
+        """批量下载（多进程）
+        
+        每个进程各自建立交易所连接和事件循环，适合下载后还有较重 CPU 处理的场景；
+        纯 I/O 时 batch_download 的协程并发更省内存。
+        """
+        if not symbols:
+            return self._summarize([], [])
+        
+        max_workers = min(max_workers, len(symbols))
+        
+        print(f"\n{'='*60}")
+        print(f"批量下载 {len(symbols)} 个加密货币（{max_workers} 个进程）")
+        print(f"{'='*60}")
+        
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_download_worker, symbol, start_date, end_date, timeframe, self.tty_progress)
+                for symbol in symbols
+            ]
+            outcomes = [f.exception() or f.result() for f in futures]
+        
+        return self._summarize(symbols, outcomes)
+    
+    def _summarize(self, symbols, outcomes):
+        """打印汇总并返回每个币种的结果"""
         results = []
         
-        for i, symbol in enumerate(symbols, 1):
-            print(f"\n[{i}/{len(symbols)}] 正在处理 {symbol}")
-            print("-" * 60)
-            
-            success = self.download_and_save(symbol, start_date, end_date, timeframe)
+        for symbol, outcome in zip(symbols, outcomes):
+            if isinstance(outcome, BaseException):
+                print(f"❌ {symbol} 异常: {str(outcome)[:80]}")
             
+            success = outcome is True
             results.append({
                 'symbol': symbol,
                 'status': 'success' if success else 'failed'
             })
-            
-            if i < len(symbols):
-                print(f"\n⏸️ 准备下载下一个币种...")
-                time.sleep(2)
         
         # 汇总
         print(f"\n{'='*60}")
@@ -227,8 +662,39 @@ class BinanceCryptoDownloaderV2:
         return results
 
 
+def _download_worker(symbol, start_date, end_date, timeframe, tty_progress=False):
+    """子进程入口：独立的下载器、连接和事件循环，避免跨进程传递交易所对象"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    
+    async def run():
+        downloader = BinanceCryptoDownloaderV2(tty_progress=tty_progress)
+        try:
+            await downloader.connect()
+            return await downloader.download_and_save(symbol, start_date, end_date, timeframe)
+        finally:
+            await downloader.close()
+    
+    return asyncio.run(run())
+
+
+async def run_batch(downloader, symbols, start_date, end_date=None, timeframe='4h'):
+    """在同一个事件循环内完成连接、批量下载和关闭"""
+    try:
+        await downloader.connect()
+        return await downloader.batch_download(symbols, start_date, end_date, timeframe)
+    finally:
+        await downloader.close()
+
+
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="Binance 加密货币数据下载工具")
+    parser.add_argument('--tty-progress', action='store_true', help="使用 tqdm 进度条显示下载进度")
+    parser.add_argument('--processes', action='store_true', help="每个币种在独立进程中下载（默认协程并发）")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    
     print("="*60)
     print("🚀 Binance 加密货币数据下载工具 v2")
     print("="*60)
@@ -236,10 +702,12 @@ def main():
     print("✅ 自动重试机制")
     print("✅ 网络容错")
     print("✅ 多种连接方式")
+    print("✅ 多币种并发下载")
+    print("✅ 本地缓存增量更新")
     print()
     
     # 初始化
-    downloader = BinanceCryptoDownloaderV2()
+    downloader = BinanceCryptoDownloaderV2(tty_progress=args.tty_progress)
     
     # 目标币种
     target_symbols = [
@@ -282,7 +750,13 @@ def main():
     
     # 开始下载
     start_time = time.time()
-    results = downloader.batch_download(target_symbols, start_date, end_date, '4h')
+    if args.processes:
+        results = downloader.batch_download_in_processes(target_symbols, start_date, end_date, '4h')
+    else:
+        try:
+            results = asyncio.run(run_batch(downloader, target_symbols, start_date, end_date, '4h'))
+        except ConnectionError:
+            exit(1)
     elapsed = time.time() - start_time
     
     print(f"\n{'='*60}")
@@ -294,11 +768,12 @@ def main():
 
 if __name__ == '__main__':
     try:
-        import ccxt
+        import ccxt.async_support as ccxt
         import pandas as pd
+        import pyarrow
     except ImportError as e:
         print(f"❌ 缺少依赖: {e}")
-        print("请运行: pip install ccxt pandas")
+        print("请运行: pip install ccxt pandas pyarrow")
         exit(1)
     
     main()
\ No newline at end of file